@@ -1,14 +1,90 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
-from app.models import QueryNode
+import asyncio
+import asyncpg
+import msgspec
+import orjson
+import time
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from typing import Any, Dict
+from app.models import QueryNode, QueryNodeStruct, BatchSearchStruct, SearchRequestStruct
 from app.query_builder import QueryBuilder
 from app.database import db
 
 router = APIRouter()
 
+# Upper bound for the limit query parameter
+MAX_LIMIT = 1000
+# Upper bound for the number of searches in one batch request
+MAX_BATCH_SIZE = 50
 
-@router.post("/jobs/search")
-async def search_jobs(query: QueryNode, limit: int = 10) -> Dict[str, Any]:
+_QUERY_DECODER = msgspec.json.Decoder(QueryNodeStruct)
+_BATCH_DECODER = msgspec.json.Decoder(BatchSearchStruct)
+
+# Component schemas for the /jobs/search request body, added to the OpenAPI
+# document in app.main. The body itself is decoded with msgspec, not Pydantic.
+QUERY_NODE_SCHEMAS = QueryNode.model_json_schema(
+    ref_template="#/components/schemas/{model}"
+)["$defs"]
+
+
+def _encode_record(obj: Any) -> Any:
+    """orjson fallback: turn asyncpg Records into dicts at serialization time"""
+    if isinstance(obj, asyncpg.Record):
+        return dict(obj.items())
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class RecordJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also accepts asyncpg Records"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_encode_record,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+
+async def _search(query: QueryNodeStruct, limit: int) -> Dict[str, Any]:
+    """Build and run one search; raises ValueError for an invalid query tree"""
+    builder = QueryBuilder()
+    sql_query, params = builder.build_query(query, limit)
+    
+    # Execute query
+    jobs = await db.execute_query(sql_query, *params)
+    
+    return {
+        "status": "success",
+        "count": len(jobs),
+        "jobs": jobs
+    }
+
+
+async def _search_batch_item(search: SearchRequestStruct) -> Dict[str, Any]:
+    """Run one search of a batch, reporting errors in its result instead of raising"""
+    start = time.perf_counter()
+    try:
+        result = await _search(search.query, search.limit)
+    except ValueError as e:
+        result = {"status": "error", "status_code": 400, "detail": str(e)}
+    except Exception as e:
+        print(f"Error: {e}")  # Log for debugging
+        result = {"status": "error", "status_code": 500, "detail": "Internal server error"}
+    result["elapsed_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+@router.post(
+    "/jobs/search",
+    response_class=RecordJSONResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": {"$ref": "#/components/schemas/QueryNode"}}},
+        }
+    },
+)
+async def search_jobs(request: Request, limit: int = Query(10, ge=1, le=MAX_LIMIT)) -> RecordJSONResponse:
     """
     Search for jobs using advanced boolean queries.
     
@@ -23,17 +99,17 @@ async def search_jobs(query: QueryNode, limit: int = 10) -> Dict[str, Any]:
     }
     """
     try:
-        builder = QueryBuilder()
-        sql_query, params = builder.build_query(query, limit)
-        
-        # Execute query
-        jobs = await db.execute_query(sql_query, *params)
-        
-        return {
-            "status": "success",
-            "count": len(jobs),
-            "jobs": jobs
-        }
+        query = _QUERY_DECODER.decode(await request.body())
+    except msgspec.DecodeError as e:
+        # Invalid JSON or a body that does not match the QueryNode schema
+        raise HTTPException(status_code=422, detail=str(e))
+    except RecursionError:
+        # msgspec decodes nested objects recursively
+        raise HTTPException(status_code=400, detail="Query is nested too deeply")
+    
+    try:
+        # Returned as a response so FastAPI skips jsonable_encoder on the Records
+        return RecordJSONResponse(await _search(query, limit))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -41,6 +117,64 @@ async def search_jobs(query: QueryNode, limit: int = 10) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.post(
+    "/jobs/search_batch",
+    response_class=RecordJSONResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": {
+                "type": "object",
+                "required": ["queries"],
+                "properties": {
+                    "queries": {
+                        "type": "array",
+                        "maxItems": MAX_BATCH_SIZE,
+                        "items": {
+                            "type": "object",
+                            "required": ["query"],
+                            "properties": {
+                                "query": {"$ref": "#/components/schemas/QueryNode"},
+                                "limit": {"type": "integer", "minimum": 1, "maximum": MAX_LIMIT, "default": 10},
+                            },
+                        },
+                    },
+                },
+            }}},
+        }
+    },
+)
+async def search_jobs_batch(request: Request) -> RecordJSONResponse:
+    """
+    Run several searches in one request.
+    
+    Body: {"queries": [{"query": QueryNode, "limit": 10}, ...]}
+    
+    Searches run concurrently. Results are returned in request order, each
+    with its own status and the server-side time it took in elapsed_ms; one
+    failing search does not fail the batch.
+    """
+    try:
+        batch = _BATCH_DECODER.decode(await request.body())
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RecursionError:
+        raise HTTPException(status_code=400, detail="Query is nested too deeply")
+    
+    if len(batch.queries) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BATCH_SIZE} queries per batch")
+    for search in batch.queries:
+        if not 1 <= search.limit <= MAX_LIMIT:
+            raise HTTPException(status_code=422, detail=f"limit must be between 1 and {MAX_LIMIT}")
+    
+    results = await asyncio.gather(*(_search_batch_item(search) for search in batch.queries))
+    return RecordJSONResponse({
+        "status": "success",
+        "count": len(results),
+        "results": results
+    })
+
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
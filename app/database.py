@@ -1,33 +1,98 @@
 import asyncpg
-from typing import List, Dict, Any
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, Iterable, List
 import os
 
 
+# Bounds for the auto-sized connection pool
+POOL_MIN_SIZE = 5
+POOL_MAX_SIZE = 100
+
+# Most executed statements prepared on every new pool connection
+HOT_STATEMENT_COUNT = 10
+# Distinct statements tracked before the execution counts are pruned
+STATEMENT_STATS_SIZE = 1000
+
+
 class Database:
     def __init__(self):
         self.pool = None
+        self.statement_counts = Counter()
         
     async def connect(self):
+        connect_kwargs = {
+            'host': os.getenv('PGHOST', 'localhost'),
+            'port': int(os.getenv('PGPORT', 5432)),
+            'user': os.getenv('PGUSER', 'postgres'),
+            'password': os.getenv('PGPASSWORD', 'supersecretpassword'),
+            'database': os.getenv('PGDATABASE', 'sumble_data'),
+        }
+        max_size = await self._pool_size(connect_kwargs)
+        print(f"Database pool size: {max_size}")
+        
         self.pool = await asyncpg.create_pool(
-            host=os.getenv('PGHOST', 'localhost'),
-            port=int(os.getenv('PGPORT', 5432)),
-            user=os.getenv('PGUSER', 'postgres'),
-            password=os.getenv('PGPASSWORD', 'supersecretpassword'),
-            database=os.getenv('PGDATABASE', 'sumble_data'),
-            min_size=10,
-            max_size=20
+            **connect_kwargs,
+            min_size=max(2, max_size // 4),
+            max_size=max_size,
+            max_inactive_connection_lifetime=300,
+            init=self._prepare_hot_statements,
+            # Per-connection cache of prepared statements keyed by SQL text.
+            # QueryBuilder emits identical text for repeated query shapes (LIMIT is
+            # a bind parameter), so repeat queries skip Parse/plan. Set to 0 when
+            # running behind pgbouncer in transaction pooling mode.
+            statement_cache_size=100
         )
     
+    async def _pool_size(self, connect_kwargs: Dict[str, Any]) -> int:
+        """Share POOL_FRACTION of the server's max_connections across WEB_CONCURRENCY workers"""
+        connection = await asyncpg.connect(**connect_kwargs)
+        try:
+            max_connections = int(await connection.fetchval("SHOW max_connections"))
+        finally:
+            await connection.close()
+        
+        workers = int(os.getenv('WEB_CONCURRENCY', 1))
+        fraction = float(os.getenv('POOL_FRACTION', 0.5))
+        size = int(max_connections * fraction / workers)
+        return max(POOL_MIN_SIZE, min(size, POOL_MAX_SIZE))
+    
+    async def _prepare_hot_statements(self, connection: asyncpg.Connection):
+        """Prepare the most executed statements on a new connection so its first use is warm"""
+        for query, _ in self.statement_counts.most_common(HOT_STATEMENT_COUNT):
+            # Connection.prepare() bypasses the statement cache that fetch() reads,
+            # so populate that cache directly.
+            await connection._prepare(query, use_cache=True)
+    
     async def disconnect(self):
         if self.pool:
             await self.pool.close()
     
-    async def execute_query(self, query: str, *args) -> List[Dict[str, Any]]:
+    async def execute_query(self, query: str, *args) -> List[asyncpg.Record]:
+        # Records are returned as-is; they are converted to dicts only when serialized
+        # Pool.fetch acquires and releases the connection internally
+        rows = await self.pool.fetch(query, *args)
+        self._record_statement(query)
+        return rows
+    
+    def warm_statements(self, queries: Iterable[str]):
+        """Mark statements as hot so new pool connections prepare them"""
+        for query in queries:
+            self._record_statement(query)
+    
+    def _record_statement(self, query: str):
+        """Count executions per statement; the top ones are prepared on new connections"""
+        self.statement_counts[query] += 1
+        if len(self.statement_counts) > STATEMENT_STATS_SIZE:
+            self.statement_counts = Counter(dict(self.statement_counts.most_common(HOT_STATEMENT_COUNT)))
+    
+    async def stream_query(self, query: str, *args, prefetch: int = 1000) -> AsyncIterator[asyncpg.Record]:
+        """Yield rows from a server-side cursor instead of materializing the full result"""
         async with self.pool.acquire() as connection:
-            rows = await connection.fetch(query, *args)
-            return [dict(row) for row in rows]
+            # Cursors only live inside a transaction
+            async with connection.transaction():
+                async for row in connection.cursor(query, *args, prefetch=prefetch):
+                    yield row
 
 
 # Global database instance
 db = Database()
-
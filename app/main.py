@@ -1,14 +1,30 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
-from app.api import router
+from app.api import router, QUERY_NODE_SCHEMAS
 from app.database import db
+from app.models import ConditionStruct, FieldType, QueryNodeStruct
+from app.query_builder import QueryBuilder
+
+# Query shapes compiled at startup: a single condition on each field
+WARMUP_QUERIES = [
+    QueryNodeStruct(type="condition", condition=ConditionStruct(field=field, value=""))
+    for field in FieldType
+]
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    # Fill the template cache and have every pool connection prepare the
+    # resulting statements, so the first requests skip both steps
+    builder = QueryBuilder()
+    db.warm_statements(builder.build_query(node)[0] for node in WARMUP_QUERIES)
     await db.connect()
+    # Generate the OpenAPI schema now instead of on the first docs request
+    app.openapi()
     yield
     # Shutdown
     await db.disconnect()
@@ -18,7 +34,9 @@ app = FastAPI(
     title="Sumble Advanced Query API",
     description="API for advanced job searching with boolean queries",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson encodes responses (including datetimes) in C
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -30,11 +48,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses (e.g. high limits) for clients that accept gzip;
+# small responses are sent as-is since compressing them costs more than it saves
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # Include routers
 app.include_router(router, prefix="/api/v1")
 
 
+def openapi():
+    """Generate the OpenAPI schema once, adding the msgspec-decoded request models"""
+    if app.openapi_schema is None:
+        schema = FastAPI.openapi(app)
+        schema.setdefault("components", {}).setdefault("schemas", {}).update(QUERY_NODE_SCHEMAS)
+    return app.openapi_schema
+
+
+app.openapi = openapi
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="uvloop", http="httptools")
 
@@ -1,3 +1,4 @@
+import msgspec
 from pydantic import BaseModel, Field
 from typing import Union, List, Literal, Optional
 from enum import Enum
@@ -54,3 +55,25 @@ class QueryNode(BaseModel):
 # Required for self-referential models
 QueryNode.model_rebuild()
 
+
+# Request-path models: msgspec decodes and validates JSON in C, several times
+# faster than Pydantic. The Pydantic models above only document the schema.
+class ConditionStruct(msgspec.Struct):
+    field: FieldType
+    value: str
+
+
+class QueryNodeStruct(msgspec.Struct):
+    type: Literal["condition", "operator"]
+    operator: Optional[LogicalOperator] = None
+    condition: Optional[ConditionStruct] = None
+    children: Optional[List['QueryNodeStruct']] = None
+
+
+class SearchRequestStruct(msgspec.Struct):
+    query: QueryNodeStruct
+    limit: int = 10
+
+
+class BatchSearchStruct(msgspec.Struct):
+    queries: List[SearchRequestStruct]
@@ -1,96 +1,278 @@
-from typing import Tuple, List, Any, Set
-from app.models import QueryNode, LogicalOperator, FieldType
+from collections import deque
+from functools import lru_cache
+from typing import Tuple, List, Any, Dict
+from app.models import QueryNodeStruct, LogicalOperator, FieldType
+
+# Number of distinct query shapes whose compiled SQL is kept in memory
+TEMPLATE_CACHE_SIZE = 256
+
+# Static selectivity heuristic, lower is more selective. AND children are
+# emitted most selective first, OR children least selective first.
+SELECTIVITY_RANK = {
+    FieldType.ORGANIZATION: 0,
+    FieldType.JOB_FUNCTION: 1,
+    FieldType.TECHNOLOGY: 2,
+}
+# Negations match most rows, so they rank behind every plain condition
+NEGATION_RANK = max(SELECTIVITY_RANK.values()) + 1
+
+# Database column searched by each field
+FIELD_COLUMN = {
+    FieldType.TECHNOLOGY: "t.name",
+    FieldType.JOB_FUNCTION: "jf.name",
+    FieldType.ORGANIZATION: "o.name",
+}
+
+# Many-to-many fields are matched with a correlated EXISTS so every job post
+# appears at most once without SELECT DISTINCT. Organization is a 1:1 JOIN.
+FIELD_EXISTS = {
+    FieldType.TECHNOLOGY: (
+        "EXISTS (SELECT 1 FROM job_posts_tech jpt INNER JOIN tech t ON jpt.tech_id = t.id"
+        " WHERE jpt.job_post_id = jp.id AND {predicate})"
+    ),
+    FieldType.JOB_FUNCTION: (
+        "EXISTS (SELECT 1 FROM job_posts_job_functions jpjf INNER JOIN job_functions jf ON jpjf.job_function_id = jf.id"
+        " WHERE jpjf.job_post_id = jp.id AND {predicate})"
+    ),
+}
+
+# JOINs needed by fields that are not matched through EXISTS, and the bit each
+# field sets in a query's join mask
+FIELD_JOINS = {
+    FieldType.ORGANIZATION: "INNER JOIN organizations o ON jp.organization_id = o.id",
+}
+FIELD_JOIN_BIT = {field: 1 << i for i, field in enumerate(FIELD_JOINS)}
+
+# How a condition value is matched against its column
+MATCH_EXACT = "exact"          # "value" in double quotes -> lower(col) = value
+MATCH_PATTERN = "pattern"      # value with * or % wildcards -> col ILIKE value
+MATCH_SUBSTRING = "substring"  # plain value -> col ILIKE %value%
 
 
 class QueryBuilder:
-    def build_query(self, node: QueryNode, limit: int = 10) -> Tuple[str, List[Any]]:
+    def build_query(self, node: QueryNodeStruct, limit: int = 10) -> Tuple[str, List[Any]]:
         """
         Build complete SQL query with JOINs and WHERE clause
         """
-        # Collect all field types needed for JOINs
-        required_joins = self._collect_required_fields(node)
-        
-        # Build base query with necessary JOINs
-        base_query = self._build_base_query(required_joins)
-        
-        # Build WHERE clause with proper parameter tracking
-        where_clause, params, _ = self._build_where_clause(node)
-        
+        # Split the tree into its structure (cache key) and literal values
+        shape, values = self._canonicalize(node)
+
+        # Compiled SQL only depends on the shape, so repeated shapes are a cache hit
+        template, slots = _compile_template(shape)
+
+        # Bind literal values in the order the placeholders appear in the SQL;
+        # LIMIT is the final placeholder so the SQL text is identical across limits
+        params: List[Any] = [values[slot] for slot in slots]
+        params.append(limit)
+
+        return template, params
+
+    def _canonicalize(self, node: QueryNodeStruct) -> Tuple[tuple, List[str]]:
+        """
+        Reduce a query tree to a simplified, hashable shape with literals masked.
+        Returns (shape, values) where values are the bind parameters of the
+        conditions in tree order.
+
+        Example shape:
+            ("op", AND, ("cond", ORGANIZATION, MATCH_SUBSTRING, 0), ("cond", TECHNOLOGY, MATCH_EXACT, 1))
+        where the last item of a condition is the index of its value.
+
+        The tree is simplified on the way: AND(x) and OR(x) become x, NOT(NOT(x))
+        becomes x and duplicate children of AND/OR are dropped, so equivalent
+        queries share a template. Values of dropped conditions are never bound.
+        """
+        values = []
+        shapes = []  # Completed child shapes, consumed when their parent exits
+        keys = []  # Literal-including key of each completed shape, to find duplicates
+        stack = deque([(node, False)])
+
+        while stack:
+            node, exiting = stack.pop()
+
+            if node.type == "condition":
+                field = node.condition.field
+                match, value = self._match_value(node.condition.value)
+                shapes.append(("cond", field, match, len(values)))
+                keys.append((field, match, value))
+                values.append(value)
+            elif node.type == "operator":
+                if exiting:
+                    count = len(node.children)
+                    shape, key = self._simplify(node.operator, shapes[-count:], keys[-count:])
+                    del shapes[-count:], keys[-count:]
+                    shapes.append(shape)
+                    keys.append(key)
+                elif not node.children:
+                    raise ValueError("Operator nodes require at least one child")
+                else:
+                    # Children are pushed reversed so they are visited in tree order
+                    stack.append((node, True))
+                    stack.extend((child, False) for child in reversed(node.children))
+            else:
+                raise ValueError(f"Unknown node type: {node.type}")
+
+        return shapes[0], values
+
+    def _simplify(self, operator: LogicalOperator, children: List[tuple], keys: List[tuple]) -> Tuple[tuple, tuple]:
+        """Build an operator shape from its child shapes, folding trivial operators"""
+        if operator is LogicalOperator.NOT:
+            child = children[0]
+            if child[0] == "op" and child[1] is LogicalOperator.NOT:
+                # NOT(NOT(x)) -> x
+                return child[2], keys[0][1]
+            return ("op", operator, child), (operator, keys[0])
+
+        # x AND x -> x, x OR x -> x; the first occurrence is kept
+        unique_children = []
+        unique_keys = []
+        seen = set()
+        for child, key in zip(children, keys):
+            if key not in seen:
+                seen.add(key)
+                unique_children.append(child)
+                unique_keys.append(key)
+
+        if len(unique_children) == 1:
+            # AND(x) -> x, OR(x) -> x
+            return unique_children[0], unique_keys[0]
+        return ("op", operator) + tuple(unique_children), (operator,) + tuple(unique_keys)
+
+    def _match_value(self, value: str) -> Tuple[str, str]:
+        """Pick the match mode for a condition value. Returns (mode, bind parameter)"""
+        if len(value) > 1 and value[0] == value[-1] == '"':
+            # Exact match can use a btree index on lower(name)
+            return MATCH_EXACT, value[1:-1].lower()
+        if "*" in value or "%" in value:
+            # Explicit wildcards, e.g. "apple*" is a prefix match
+            return MATCH_PATTERN, value.replace("*", "%")
+        return MATCH_SUBSTRING, f"%{value}%"
+
+    def _compile(self, shape: tuple) -> Tuple[str, List[int]]:
+        """
+        Compile a query shape into SQL with LIMIT bound to the last placeholder.
+        Returns (sql, slots) where slots[i] is the index of the value bound to ${i+1}.
+
+        A single post-order walk collects the fields that need JOINs and builds
+        the WHERE clause with proper parameter tracking.
+        """
+        ranks = self._selectivity_ranks(shape)
+        join_mask = 0
+        slots = []
+        clauses = []  # Completed child clauses, consumed when their parent exits
+        stack = deque([(shape, False)])
+
+        while stack:
+            shape, exiting = stack.pop()
+
+            if shape[0] == "cond":
+                _, field, match, slot = shape
+                join_mask |= FIELD_JOIN_BIT.get(field, 0)
+                clauses.append(self._build_condition(field, match, len(slots)))
+                slots.append(slot)
+            elif shape[1] is LogicalOperator.NOT and shape[2][0] == "cond":
+                # Push the negation into the condition so it can be matched directly
+                _, field, match, slot = shape[2]
+                join_mask |= FIELD_JOIN_BIT.get(field, 0)
+                clauses.append(self._build_condition(field, match, len(slots), negated=True))
+                slots.append(slot)
+            elif exiting:
+                count = len(shape) - 2
+                children = clauses[-count:]
+                del clauses[-count:]
+                clauses.append(self._build_operator(shape[1], children))
+            else:
+                children = shape[2:]
+                if shape[1] is not LogicalOperator.NOT:
+                    children = sorted(
+                        children,
+                        key=lambda child: ranks[id(child)],
+                        reverse=shape[1] is not LogicalOperator.AND,
+                    )
+                # Children are pushed reversed so they are emitted in the order above
+                stack.append((shape[:2] + tuple(children), True))
+                stack.extend((child, False) for child in reversed(children))
+
+        # Base query with necessary JOINs, precomputed for every join mask
+        base_query = BASE_QUERIES[join_mask]
+
         # Combine into final query
-        query = f"{base_query} WHERE {where_clause} LIMIT {limit}"
-        
-        return query, params
-    
-    def _collect_required_fields(self, node: QueryNode) -> Set[FieldType]:
-        """Recursively collect all field types that need JOINs"""
-        fields = set()
-        
-        if node.type == "condition":
-            fields.add(node.condition.field)
-        elif node.type == "operator" and node.children:
-            for child in node.children:
-                fields.update(self._collect_required_fields(child))
-        
-        return fields
-    
-    def _build_base_query(self, required_fields: Set[FieldType]) -> str:
-        """Build SELECT with necessary JOINs based on required fields"""
-        query_parts = [
-            "SELECT DISTINCT jp.id, jp.datetime_pulled",
-            "FROM job_posts jp"
-        ]
-        
-        if FieldType.ORGANIZATION in required_fields:
-            query_parts.append("INNER JOIN organizations o ON jp.organization_id = o.id")
-        
-        if FieldType.TECHNOLOGY in required_fields:
-            query_parts.append("INNER JOIN job_posts_tech jpt ON jp.id = jpt.job_post_id")
-            query_parts.append("INNER JOIN tech t ON jpt.tech_id = t.id")
-        
-        if FieldType.JOB_FUNCTION in required_fields:
-            query_parts.append("INNER JOIN job_posts_job_functions jpjf ON jp.id = jpjf.job_post_id")
-            query_parts.append("INNER JOIN job_functions jf ON jpjf.job_function_id = jf.id")
-        
-        return " ".join(query_parts)
-    
-    def _build_where_clause(self, node: QueryNode, param_offset: int = 0) -> Tuple[str, List[Any], int]:
-        """Recursively build WHERE clause from query tree. Returns (clause, params, next_offset)"""
-        if node.type == "condition":
-            return self._build_condition(node.condition, param_offset)
-        elif node.type == "operator":
-            return self._build_operator(node, param_offset)
-        else:
-            raise ValueError(f"Unknown node type: {node.type}")
-    
-    def _build_condition(self, condition, param_offset: int) -> Tuple[str, List[Any], int]:
+        return f"{base_query} WHERE {clauses[0]} LIMIT ${len(slots) + 1}", slots
+
+    def _selectivity_ranks(self, shape: tuple) -> Dict[int, int]:
+        """Map id() of every sub-shape to its rank: the min rank of its descendants"""
+        ranks = {}
+        stack = deque([(shape, False)])
+
+        while stack:
+            shape, exiting = stack.pop()
+
+            if shape[0] == "cond":
+                ranks[id(shape)] = SELECTIVITY_RANK[shape[1]]
+            elif shape[1] is LogicalOperator.NOT:
+                ranks[id(shape)] = NEGATION_RANK
+                stack.extend((child, False) for child in shape[2:])
+            elif exiting:
+                ranks[id(shape)] = min(ranks[id(child)] for child in shape[2:])
+            else:
+                stack.append((shape, True))
+                stack.extend((child, False) for child in shape[2:])
+
+        return ranks
+
+    def _build_condition(self, field: FieldType, match: str, param_offset: int, negated: bool = False) -> str:
         """Build SQL condition for a single field"""
-        # Map fields to actual database columns
-        field_mapping = {
-            FieldType.TECHNOLOGY: "t.name",
-            FieldType.JOB_FUNCTION: "jf.name", 
-            FieldType.ORGANIZATION: "o.name"
-        }
-        
-        column = field_mapping[condition.field]
-        # Use ILIKE for case-insensitive search with proper param numbering
-        return f"{column} ILIKE ${param_offset + 1}", [f"%{condition.value}%"], param_offset + 1
-    
-    def _build_operator(self, node: QueryNode, param_offset: int) -> Tuple[str, List[Any], int]:
-        """Build SQL for logical operators with proper parameter tracking"""
-        if node.operator == LogicalOperator.NOT:
-            sub_clause, params, next_offset = self._build_where_clause(node.children[0], param_offset)
-            return f"NOT ({sub_clause})", params, next_offset
-        
+        column = FIELD_COLUMN[field]
+        placeholder = f"${param_offset + 1}"
+        exists = FIELD_EXISTS.get(field)
+
+        # Inside EXISTS the negation applies to the whole subquery: the job post
+        # has no matching row, rather than some row that does not match
+        negate_predicate = negated and exists is None
+
+        if match == MATCH_EXACT:
+            # Parameter is already lowercased
+            operator = "<>" if negate_predicate else "="
+            predicate = f"lower({column}) {operator} {placeholder}"
+        else:
+            # Use ILIKE for case-insensitive search with proper param numbering
+            operator = "NOT ILIKE" if negate_predicate else "ILIKE"
+            predicate = f"{column} {operator} {placeholder}"
+
+        if exists is None:
+            return predicate
+        clause = exists.format(predicate=predicate)
+        return f"NOT {clause}" if negated else clause
+
+    def _build_operator(self, operator: LogicalOperator, clauses: List[str]) -> str:
+        """Combine already-built child clauses with a logical operator"""
+        if operator is LogicalOperator.NOT:
+            return f"NOT ({clauses[0]})"
+
         # For AND/OR operators
-        clauses = []
-        all_params = []
-        current_offset = param_offset
-        
-        for child in node.children:
-            sub_clause, params, current_offset = self._build_where_clause(child, current_offset)
-            clauses.append(f"({sub_clause})")
-            all_params.extend(params)
-        
-        operator = " AND " if node.operator == LogicalOperator.AND else " OR "
-        return operator.join(clauses), all_params, current_offset
+        joiner = " AND " if operator is LogicalOperator.AND else " OR "
+        return joiner.join(f"({clause})" for clause in clauses)
+
+
+def _build_base_query(join_mask: int) -> str:
+    """Build SELECT with the JOINs of the fields set in join_mask"""
+    query_parts = [
+        "SELECT jp.id, jp.datetime_pulled",
+        "FROM job_posts jp"
+    ]
+
+    for field, join in FIELD_JOINS.items():
+        if join_mask & FIELD_JOIN_BIT[field]:
+            query_parts.append(join)
+
+    return " ".join(query_parts)
+
+
+# Base query for every combination of JOINs, indexed by join mask
+BASE_QUERIES = tuple(_build_base_query(mask) for mask in range(1 << len(FIELD_JOINS)))
+
 
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _compile_template(shape: tuple) -> Tuple[str, Tuple[int, ...]]:
+    """Compile SQL for a query shape; cached at module level so it survives across requests"""
+    sql, slots = QueryBuilder()._compile(shape)
+    return sql, tuple(slots)
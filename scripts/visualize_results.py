@@ -3,7 +3,8 @@
 Create a visual performance dashboard from test results.
 """
 
-import json
+import numpy as np
+import orjson
 
 
 def create_ascii_bar_chart(data, title, max_width=60):
@@ -11,50 +12,123 @@ def create_ascii_bar_chart(data, title, max_width=60):
     if not data:
         return ""
     
-    max_value = max(v for _, v in data)
+    labels, values = zip(*data)
+    values = np.asarray(values, dtype=np.float64)
+    max_value = values.max()
     
-    output = [f"\n{title}", "=" * len(title)]
+    # All bar lengths in one vectorized pass
+    if max_value > 0:
+        bars = (values / max_value * max_width).astype(np.int32)
+    else:
+        bars = np.zeros(len(values), dtype=np.int32)
     
-    for label, value in data:
-        bar_length = int((value / max_value) * max_width) if max_value > 0 else 0
-        bar = "█" * bar_length
-        output.append(f"{label:40s} {bar} {value:.2f}")
+    output = [f"\n{title}", "=" * len(title)]
+    output.extend(
+        f"{label:40s} {'█' * bar} {value:.2f}"
+        for label, bar, value in zip(labels, bars, values)
+    )
     
     return "\n".join(output)
 
 
+# Query complexity categories, derived once per result from its name
+SINGLE = 1
+SIMPLE_AND = 2
+COMPLEX_NESTED = 4
+
+
+def query_complexity(name):
+    """Bitmask of the complexity categories a test name falls into."""
+    has_and = "AND" in name
+    has_not_or = "NOT" in name or "OR" in name
+    mask = 0
+    if "Single Condition" in name:
+        mask |= SINGLE
+    if has_and and not has_not_or:
+        mask |= SIMPLE_AND
+    if has_and and has_not_or:
+        mask |= COMPLEX_NESTED
+    return mask
+
+
+def test_number(name):
+    """Number of a test from its "N. ..." name; unnumbered tests sort last."""
+    number, _, _ = name.partition(".")
+    return int(number) if number.isdigit() else float("inf")
+
+
 def main():
     # Load test results
     import os
     script_dir = os.path.dirname(os.path.abspath(__file__))
     results_path = os.path.join(script_dir, "..", "reports", "test_results.json")
     
-    with open(results_path, "r") as f:
-        results = json.load(f)
-    
-    successful = [r for r in results if r["success"]]
-    
-    if not successful:
+    with open(results_path, "rb") as f:
+        results = orjson.loads(f.read())
+    
+    # Results are exported as they complete; chart them in definition order
+    results.sort(key=lambda r: test_number(r["name"]))
+    
+    # Aggregate everything in a single pass over the results
+    times = []
+    jobs = []
+    times_data = []
+    jobs_data = []
+    fast = medium = slow = 0
+    complexity_count = {SINGLE: 0, SIMPLE_AND: 0, COMPLEX_NESTED: 0}
+    complexity_time = {SINGLE: 0.0, SIMPLE_AND: 0.0, COMPLEX_NESTED: 0.0}
+    
+    for r in results:
+        if not r["success"]:
+            continue
+        
+        name = r["name"]
+        job_count = r["job_count"]
+        jobs.append(job_count)
+        if job_count > 0 and len(jobs_data) < 10:
+            jobs_data.append((name[:35] + "...", job_count))
+        
+        # Cached results were answered by the test client without an API
+        # call, so they only count towards the job stats
+        if r.get("cached"):
+            continue
+        
+        response_time = r["response_time_ms"]
+        times.append(response_time)
+        if len(times_data) < 10:
+            times_data.append((name[:35] + "...", response_time))
+        
+        if response_time < 100:
+            fast += 1
+        elif response_time < 500:
+            medium += 1
+        else:
+            slow += 1
+        
+        mask = query_complexity(name)
+        for category in complexity_count:
+            if mask & category:
+                complexity_count[category] += 1
+                complexity_time[category] += response_time
+    
+    if not times:
         print("No successful results to visualize.")
         return
     
+    times = np.asarray(times, dtype=np.float64)
+    jobs = np.asarray(jobs, dtype=np.int64)
+    
     print("\n" + "="*80)
     print("SUMBLE API - PERFORMANCE DASHBOARD")
     print("="*80)
     
     # Response time by test
-    times_data = [(r["name"][:35] + "...", r["response_time_ms"]) for r in successful[:10]]
     print(create_ascii_bar_chart(times_data, "Response Times (First 10 Tests) [ms]"))
     
     # Job counts
-    jobs_data = [(r["name"][:35] + "...", r["job_count"]) for r in successful if r["job_count"] > 0][:10]
     print(create_ascii_bar_chart(jobs_data, "\nJob Counts (Top 10 by results)", max_width=50))
     
     # Performance tiers
-    fast = sum(1 for r in successful if r["response_time_ms"] < 100)
-    medium = sum(1 for r in successful if 100 <= r["response_time_ms"] < 500)
-    slow = sum(1 for r in successful if r["response_time_ms"] >= 500)
-    
     print("\n\nPerformance Tiers")
     print("="*40)
     print(f"⚡ Fast (<100ms):    {fast:2d} tests {'█' * int(fast * 2)}")
@@ -62,39 +136,34 @@ def main():
     print(f"🐢 Slow (>500ms):    {slow:2d} tests {'█' * int(slow * 2)}")
     
     # Stats summary
-    times = [r["response_time_ms"] for r in successful]
-    jobs = [r["job_count"] for r in successful]
-    
     print("\n\nKey Performance Indicators")
     print("="*40)
     print(f"✅ Success Rate:     100%")
-    print(f"⚡ Fastest Query:    {min(times):.2f}ms")
-    print(f"🐢 Slowest Query:    {max(times):.2f}ms")
-    print(f"📊 Average Time:     {sum(times)/len(times):.2f}ms")
-    print(f"🎯 Total Jobs Found: {sum(jobs)}")
-    print(f"📈 Avg Jobs/Query:   {sum(jobs)/len(jobs):.2f}")
+    print(f"⚡ Fastest Query:    {times.min():.2f}ms")
+    print(f"🐢 Slowest Query:    {times.max():.2f}ms")
+    print(f"📊 Average Time:     {times.mean():.2f}ms")
+    print(f"🎯 Total Jobs Found: {jobs.sum()}")
+    print(f"📈 Avg Jobs/Query:   {jobs.mean():.2f}")
     
     # Query complexity analysis
     print("\n\nQuery Complexity Analysis")
     print("="*40)
     
-    single = [r for r in successful if "Single Condition" in r["name"]]
-    simple_and = [r for r in successful if "AND" in r["name"] and "NOT" not in r["name"] and "OR" not in r["name"]]
-    complex_nested = [r for r in successful if ("NOT" in r["name"] or "OR" in r["name"]) and "AND" in r["name"]]
-    
-    if single:
-        print(f"Simple (1 condition):  {len(single):2d} tests | Avg: {sum(r['response_time_ms'] for r in single)/len(single):.2f}ms")
-    if simple_and:
-        print(f"AND queries:           {len(simple_and):2d} tests | Avg: {sum(r['response_time_ms'] for r in simple_and)/len(simple_and):.2f}ms")
-    if complex_nested:
-        print(f"Complex nested:        {len(complex_nested):2d} tests | Avg: {sum(r['response_time_ms'] for r in complex_nested)/len(complex_nested):.2f}ms")
+    labels = {
+        SINGLE: "Simple (1 condition):  ",
+        SIMPLE_AND: "AND queries:           ",
+        COMPLEX_NESTED: "Complex nested:        ",
+    }
+    for category, label in labels.items():
+        count = complexity_count[category]
+        if count:
+            print(f"{label}{count:2d} tests | Avg: {complexity_time[category]/count:.2f}ms")
     
     print("\n" + "="*80)
     print("📊 Full report available in: TESTING_REPORT.md")
     print("📁 Raw data available in: test_results.json")
     print("="*80 + "\n")
 
-
 if __name__ == "__main__":
     main()
 
@@ -4,16 +4,41 @@ Comprehensive test suite for the Sumble Advanced Query API.
 Tests various query patterns and measures performance metrics.
 """
 
+import argparse
 import asyncio
 import httpx
+import orjson
+import uvloop
 import time
-import statistics
-from typing import Dict, List, Any
-from dataclasses import dataclass
-import json
+import hashlib
+import os
+import re
+import numpy as np
+from array import array
+from hdrh.histogram import HdrHistogram
+from collections import OrderedDict
+from typing import Callable, Dict, List, Any, Optional
+from dataclasses import dataclass, field, replace
 
 
-@dataclass
+# Search endpoint, relative to the client's base URL
+SEARCH_PATH = "/api/v1/jobs/search"
+BATCH_SEARCH_PATH = "/api/v1/jobs/search_batch"
+# Number of batch requests the test queries are split into
+BATCH_COUNT = 4
+# Untimed request sent before the tests to open the connection and warm the server
+WARMUP_BODY = b'{"type":"condition","condition":{"field":"organization","value":"__warmup__"}}'
+# Maximum number of test queries in flight at once
+CONCURRENCY = 10
+# Number of distinct queries whose responses are kept by the client-side cache
+RESPONSE_CACHE_SIZE = 128
+# Top-level "count" of a search response; it precedes the "jobs" array
+COUNT_PATTERN = re.compile(rb'"count"\s*:\s*(\d+)')
+# Latency percentiles reported in the summary
+PERCENTILES = [50, 75, 90, 95, 99, 99.9]
+
+
+@dataclass(slots=True, frozen=True)
 class TestResult:
     name: str
     query: Dict[str, Any]
@@ -22,76 +47,399 @@ class TestResult:
     status_code: int
     response_time_ms: float
     job_count: int
-    error: str = None
+    error: str = ""
+    cached: bool = False
+    # Exported fields, built once when the result is created
+    json: Dict[str, Any] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, "json", {
+            "name": self.name,
+            "limit": self.limit,
+            "success": self.success,
+            "status_code": self.status_code,
+            "response_time_ms": self.response_time_ms,
+            "job_count": self.job_count,
+            "error": self.error,
+            "cached": self.cached
+        })
+
+
+class ReportWriter:
+    """Write results to a JSON array file one at a time, as they complete."""
+    
+    def __init__(self, path: str):
+        self._file = open(path, "wb")
+        self._file.write(b"[")
+        self._first = True
+    
+    def write(self, result: TestResult):
+        separator = b"\n  " if self._first else b",\n  "
+        self._first = False
+        item = orjson.dumps(result.json, option=orjson.OPT_INDENT_2)
+        self._file.write(separator + item.replace(b"\n", b"\n  "))
+    
+    def close(self):
+        self._file.write(b"]\n" if self._first else b"\n]\n")
+        self._file.close()
 
 
 class APITester:
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    def __init__(self, base_url: str = "http://localhost:8000",
+                 on_result: Optional[Callable[[TestResult], None]] = None):
         self.base_url = base_url
         self.results: List[TestResult] = []
+        # Called with every result as soon as it is recorded
+        self.on_result = on_result
+        # Numeric columns of successful results, kept separately for fast summary stats.
+        # Response times exclude cached results, which did not hit the API.
+        self._rt = array("d")
+        self._jobs = array("q")
+        # Response times in microseconds, 1us to 60s at 3 significant digits
+        self.hist = HdrHistogram(1, 60_000_000, 3)
+        # Successful results by canonical query, least recently used first
+        self._cache: "OrderedDict[str, TestResult]" = OrderedDict()
+        # Request URL per limit and shared headers, built once instead of per call
+        self._url_for_limit: Dict[int, str] = {}
+        # Large responses come back gzip-compressed; httpx inflates them with zlib
+        self._json_headers = {"Content-Type": "application/json", "Accept-Encoding": "gzip"}
+        # Negotiated HTTP version, checked on the first response
+        self.http_version: Optional[str] = None
+        # Async client, created on first use so synchronous runs never build it
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Client shared by the whole run so connections are kept alive between tests."""
+        if self._client is None:
+            # HTTP/2 lets concurrent tests share a connection when the server supports it
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=True,
+                timeout=60.0,
+                limits=httpx.Limits(
+                    max_keepalive_connections=20,
+                    max_connections=100,
+                    keepalive_expiry=30
+                )
+            )
+        return self._client
+    
+    def reset(self):
+        """Forget recorded results and cached responses, keeping the client and its connections."""
+        self.results = []
+        self._rt = array("d")
+        self._jobs = array("q")
+        self.hist.reset()
+        self._cache.clear()
+    
+    async def aclose(self):
+        """Close the shared HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+    
+    async def warm_up(self):
+        """Send one discarded request so connection setup is not timed in the first test."""
+        try:
+            response = await self.client.post(self._search_url(1), content=WARMUP_BODY, headers=self._json_headers)
+            self._check_http_version(response)
+        except httpx.HTTPError as e:
+            # The tests themselves report the failure
+            print(f"⚠️  Warm-up request failed: {e}")
+    
+    def _search_url(self, limit: int) -> str:
+        """Search URL with the limit already encoded in the query string."""
+        url = self._url_for_limit.get(limit)
+        if url is None:
+            url = self._url_for_limit[limit] = f"{SEARCH_PATH}?limit={limit}"
+        return url
+    
+    def _cache_key(self, query: Dict[str, Any]) -> str:
+        """Content hash of a query; logically equivalent queries share a key."""
+        return hashlib.blake2b(canonical_query(query), digest_size=16).hexdigest()
+    
+    async def test_query(self, name: str, query: Dict[str, Any], limit: int = 10,
+                         body: Optional[bytes] = None) -> TestResult:
+        """Test a single query and measure performance.
+        
+        `body` is the pre-serialized JSON of `query`; it is serialized here if omitted.
+        """
+        key = self._cache_key(query)
+        result = self._cached_result(key, name, query, limit)
+        if result is not None:
+            return result
+        
+        start_time = time.perf_counter()
+        
+        try:
+            response = await self.client.post(**self._build_request(query, limit, body))
+            result = self._parse_response(name, query, limit, response, start_time)
+        except Exception as e:
+            result = self._failed_result(name, query, limit, e, start_time)
+        
+        self._cache_result(key, result)
+        self._record(result)
+        return result
     
-    async def test_query(self, name: str, query: Dict[str, Any], limit: int = 10) -> TestResult:
-        """Test a single query and measure performance."""
-        url = f"{self.base_url}/api/v1/jobs/search"
+    def test_query_sync(self, client: httpx.Client, name: str, query: Dict[str, Any], limit: int = 10,
+                        body: Optional[bytes] = None) -> TestResult:
+        """Blocking variant of test_query for runs that do not need an event loop."""
+        key = self._cache_key(query)
+        result = self._cached_result(key, name, query, limit)
+        if result is not None:
+            return result
         
         start_time = time.perf_counter()
         
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    url,
-                    json=query,
-                    params={"limit": limit}
-                )
-                
-                end_time = time.perf_counter()
-                response_time_ms = (end_time - start_time) * 1000
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    result = TestResult(
-                        name=name,
-                        query=query,
-                        limit=limit,
-                        success=True,
-                        status_code=response.status_code,
-                        response_time_ms=response_time_ms,
-                        job_count=data.get("count", 0)
-                    )
-                else:
-                    result = TestResult(
-                        name=name,
-                        query=query,
-                        limit=limit,
-                        success=False,
-                        status_code=response.status_code,
-                        response_time_ms=response_time_ms,
-                        job_count=0,
-                        error=response.text
-                    )
+            response = client.post(**self._build_request(query, limit, body))
+            result = self._parse_response(name, query, limit, response, start_time)
         except Exception as e:
-            end_time = time.perf_counter()
-            response_time_ms = (end_time - start_time) * 1000
-            result = TestResult(
+            result = self._failed_result(name, query, limit, e, start_time)
+        
+        self._cache_result(key, result)
+        self._record(result)
+        return result
+    
+    def _build_request(self, query: Dict[str, Any], limit: int, body: Optional[bytes]) -> Dict[str, Any]:
+        """Keyword arguments of the search request, for either client."""
+        if body is None:
+            body = serialize_query(query)
+        return {"url": self._search_url(limit), "content": body, "headers": self._json_headers}
+    
+    def _parse_response(self, name: str, query: Dict[str, Any], limit: int,
+                        response: httpx.Response, start_time: float) -> TestResult:
+        """Build the result of a search response."""
+        response_time_ms = (time.perf_counter() - start_time) * 1000
+        self._check_http_version(response)
+        
+        if response.status_code == 200:
+            return TestResult(
                 name=name,
                 query=query,
                 limit=limit,
-                success=False,
-                status_code=0,
+                success=True,
+                status_code=response.status_code,
                 response_time_ms=response_time_ms,
-                job_count=0,
-                error=str(e)
+                job_count=parse_job_count(response.content)
+            )
+        return TestResult(
+            name=name,
+            query=query,
+            limit=limit,
+            success=False,
+            status_code=response.status_code,
+            response_time_ms=response_time_ms,
+            job_count=0,
+            error=response.text
+        )
+    
+    def _failed_result(self, name: str, query: Dict[str, Any], limit: int,
+                       error: Exception, start_time: float) -> TestResult:
+        """Build the result of a request that raised before a response arrived."""
+        return TestResult(
+            name=name,
+            query=query,
+            limit=limit,
+            success=False,
+            status_code=0,
+            response_time_ms=(time.perf_counter() - start_time) * 1000,
+            job_count=0,
+            error=str(error)
+        )
+    
+    async def test_batch(self, test_defs: List[Dict[str, Any]]) -> List[TestResult]:
+        """Test several queries with one batch request.
+        
+        Each query's response time is the server-side time the API reports for
+        it in elapsed_ms, which excludes the network. When the batch itself
+        fails, each query is attributed an equal share of the round trip.
+        """
+        bodies = [test_def.get("body") or serialize_query(test_def["query"]) for test_def in test_defs]
+        content = b'{"queries":[' + b",".join(
+            b'{"query":%b,"limit":%d}' % (body, test_def["limit"])
+            for body, test_def in zip(bodies, test_defs)
+        ) + b"]}"
+        
+        start_time = time.perf_counter()
+        
+        try:
+            response = await self.client.post(BATCH_SEARCH_PATH, content=content, headers=self._json_headers)
+            batch_time_ms = (time.perf_counter() - start_time) * 1000 / len(test_defs)
+            self._check_http_version(response)
+            if response.status_code == 200:
+                items = orjson.loads(response.content)["results"]
+            else:
+                items = [{"status": "error", "status_code": response.status_code, "detail": response.text}] * len(test_defs)
+        except Exception as e:
+            batch_time_ms = (time.perf_counter() - start_time) * 1000 / len(test_defs)
+            items = [{"status": "error", "status_code": 0, "detail": str(e)}] * len(test_defs)
+        
+        results = []
+        for test_def, item in zip(test_defs, items):
+            success = item["status"] == "success"
+            result = TestResult(
+                name=test_def["name"],
+                query=test_def["query"],
+                limit=test_def["limit"],
+                success=success,
+                status_code=200 if success else item["status_code"],
+                response_time_ms=item.get("elapsed_ms", batch_time_ms),
+                job_count=item["count"] if success else 0,
+                error="" if success else item["detail"]
             )
+            self._cache_result(self._cache_key(test_def["query"]), result)
+            self._record(result)
+            results.append(result)
+        return results
+    
+    def _cached_result(self, key: str, name: str, query: Dict[str, Any], limit: int) -> Optional[TestResult]:
+        """Record and return a result derived from an earlier response, if one covers this request.
         
-        self.results.append(result)
+        The server returns min(matches, limit) jobs, so a response for the same
+        query answers any smaller limit, and any limit at all once it came back
+        short of its own limit.
+        """
+        cached = self._cache.get(key)
+        if cached is None or (cached.limit < limit and cached.job_count >= cached.limit):
+            return None
+        # Equivalent query already answered; reuse it without a round trip
+        self._cache.move_to_end(key)
+        result = replace(
+            cached,
+            name=name,
+            query=query,
+            limit=limit,
+            response_time_ms=0.0,
+            job_count=min(cached.job_count, limit),
+            cached=True
+        )
+        self._record(result)
         return result
     
+    def _cache_result(self, key: str, result: TestResult):
+        """Keep a successful result for later equivalent requests, preferring the largest limit."""
+        if not result.success:
+            return
+        cached = self._cache.get(key)
+        if cached is None or cached.limit < result.limit:
+            self._cache[key] = result
+        self._cache.move_to_end(key)
+        if len(self._cache) > RESPONSE_CACHE_SIZE:
+            self._cache.popitem(last=False)
+    
+    def _check_http_version(self, response: httpx.Response):
+        """Log once when the server did not negotiate HTTP/2."""
+        if self.http_version is not None:
+            return
+        self.http_version = response.http_version
+        if self.http_version != "HTTP/2":
+            print(f"ℹ️  Server responded with {self.http_version}; requests are not multiplexed")
+    
+    def _record(self, result: TestResult):
+        """Store a result and its numeric columns."""
+        self.results.append(result)
+        if result.success:
+            self._jobs.append(result.job_count)
+            if not result.cached:
+                self._rt.append(result.response_time_ms)
+                self.hist.record_value(max(1, int(result.response_time_ms * 1000)))
+        if self.on_result is not None:
+            self.on_result(result)
+    
+    async def run_tests(self, test_defs: List[Dict[str, Any]], concurrency: int = CONCURRENCY) -> List[TestResult]:
+        """Run test queries concurrently; results are returned in definition order."""
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run(test_def: Dict[str, Any]) -> TestResult:
+            async with semaphore:
+                return await self.test_query(
+                    name=test_def["name"],
+                    query=test_def["query"],
+                    limit=test_def["limit"],
+                    body=test_def.get("body")
+                )
+        
+        return await asyncio.gather(*(run(test_def) for test_def in test_defs))
+    
+    async def run_batched(self, test_defs: List[Dict[str, Any]], batches: int = BATCH_COUNT) -> List[TestResult]:
+        """Run test queries as a few concurrent batch requests; results are returned in definition order."""
+        results: List[Optional[TestResult]] = [None] * len(test_defs)
+        keys = [self._cache_key(test_def["query"]) for test_def in test_defs]
+        pending = list(range(len(test_defs)))
+        
+        while pending:
+            remaining = []
+            for i in pending:
+                test_def = test_defs[i]
+                results[i] = self._cached_result(keys[i], test_def["name"], test_def["query"], test_def["limit"])
+                if results[i] is None:
+                    remaining.append(i)
+            
+            # Send each distinct query once, at its largest limit; the other
+            # requests for it are derived from that response on the next pass
+            largest: Dict[str, int] = {}
+            for i in remaining:
+                j = largest.get(keys[i])
+                if j is None or test_defs[i]["limit"] > test_defs[j]["limit"]:
+                    largest[keys[i]] = i
+            send = sorted(largest.values())
+            
+            if send:
+                size = -(-len(send) // batches)
+                chunks = [send[i:i + size] for i in range(0, len(send), size)]
+                
+                async def run(chunk: List[int]):
+                    return chunk, await self.test_batch([test_defs[i] for i in chunk])
+                
+                # Batches are recorded in the order they finish
+                for future in asyncio.as_completed([run(chunk) for chunk in chunks]):
+                    chunk, batch_results = await future
+                    for i, result in zip(chunk, batch_results):
+                        results[i] = result
+            
+            pending = [i for i in remaining if results[i] is None]
+        
+        return results
+    
+    def run_sync(self, test_defs: List[Dict[str, Any]]) -> List[TestResult]:
+        """Run test queries from synchronous code.
+        
+        A single query is sent with a blocking client, skipping event loop and
+        async client setup; anything more runs concurrently on an event loop.
+        """
+        if len(test_defs) != 1:
+            async def run() -> List[TestResult]:
+                try:
+                    return await self.run_tests(test_defs)
+                finally:
+                    await self.aclose()
+            
+            loop = uvloop.new_event_loop()
+            try:
+                return loop.run_until_complete(run())
+            finally:
+                loop.close()
+        
+        test_def = test_defs[0]
+        with httpx.Client(base_url=self.base_url, http2=True, timeout=60.0) as client:
+            return [self.test_query_sync(
+                client,
+                name=test_def["name"],
+                query=test_def["query"],
+                limit=test_def["limit"],
+                body=test_def.get("body")
+            )]
+    
     def print_result(self, result: TestResult):
         """Print a single test result."""
         status = "✅" if result.success else "❌"
         print(f"\n{status} {result.name}")
         print(f"   Limit: {result.limit}")
-        print(f"   Response Time: {result.response_time_ms:.2f}ms")
+        if result.cached:
+            print("   Response Time: cached")
+        else:
+            print(f"   Response Time: {result.response_time_ms:.2f}ms")
         print(f"   Status Code: {result.status_code}")
         print(f"   Jobs Found: {result.job_count}")
         if result.error:
@@ -103,37 +451,43 @@ class APITester:
             print("\nNo results to summarize.")
             return
         
-        successful = [r for r in self.results if r.success]
         failed = [r for r in self.results if not r.success]
+        # Zero-copy views of the result columns
+        rt = np.frombuffer(self._rt, dtype=np.float64)
+        jobs = np.frombuffer(self._jobs, dtype=np.int64)
         
         print("\n" + "="*80)
         print("TEST SUMMARY")
         print("="*80)
         print(f"\nTotal Tests: {len(self.results)}")
-        print(f"✅ Passed: {len(successful)}")
+        print(f"✅ Passed: {len(jobs)}")
         print(f"❌ Failed: {len(failed)}")
+        print(f"💾 Cached: {len(jobs) - len(rt)}")
         
-        if successful:
-            response_times = [r.response_time_ms for r in successful]
-            job_counts = [r.job_count for r in successful]
+        if len(rt):
+            stats = summarize(rt, jobs)
             
             print("\n" + "-"*80)
             print("PERFORMANCE METRICS (Successful Queries)")
             print("-"*80)
             print(f"Response Time:")
-            print(f"  Min:    {min(response_times):.2f}ms")
-            print(f"  Max:    {max(response_times):.2f}ms")
-            print(f"  Mean:   {statistics.mean(response_times):.2f}ms")
-            print(f"  Median: {statistics.median(response_times):.2f}ms")
-            if len(response_times) > 1:
-                print(f"  StdDev: {statistics.stdev(response_times):.2f}ms")
+            print(f"  Min:    {stats['rt_min']:.2f}ms")
+            print(f"  Max:    {stats['rt_max']:.2f}ms")
+            print(f"  Mean:   {stats['rt_mean']:.2f}ms")
+            if len(rt) > 1:
+                print(f"  StdDev: {stats['rt_stdev']:.2f}ms")
+            
+            print(f"\nLatency Percentiles:")
+            for percentile in PERCENTILES:
+                label = f"P{percentile:g}:"
+                print(f"  {label:7s} {self.hist.get_value_at_percentile(percentile) / 1000:.2f}ms")
             
             print(f"\nJob Counts:")
-            print(f"  Min:    {min(job_counts)}")
-            print(f"  Max:    {max(job_counts)}")
-            print(f"  Mean:   {statistics.mean(job_counts):.2f}")
-            print(f"  Median: {statistics.median(job_counts):.2f}")
-            print(f"  Total:  {sum(job_counts)} jobs across all queries")
+            print(f"  Min:    {stats['jobs_min']}")
+            print(f"  Max:    {stats['jobs_max']}")
+            print(f"  Mean:   {stats['jobs_mean']:.2f}")
+            print(f"  Median: {stats['jobs_median']:.2f}")
+            print(f"  Total:  {stats['jobs_sum']} jobs across all queries")
         
         if failed:
             print("\n" + "-"*80)
@@ -144,6 +498,64 @@ class APITester:
                 print(f"   Error: {result.error}")
 
 
+def summarize(rt: np.ndarray, jobs: np.ndarray) -> Dict[str, Any]:
+    """Reduce the response time and job count columns to summary statistics.
+    
+    `rt` must not be empty; the stdev is NaN for a single response time.
+    """
+    return {
+        "rt_min": rt.min(),
+        "rt_max": rt.max(),
+        "rt_mean": rt.mean(),
+        "rt_stdev": rt.std(ddof=1) if len(rt) > 1 else float("nan"),
+        "jobs_min": jobs.min(),
+        "jobs_max": jobs.max(),
+        "jobs_mean": jobs.mean(),
+        "jobs_median": np.median(jobs),
+        "jobs_sum": jobs.sum(),
+    }
+
+
+def parse_job_count(content: bytes) -> int:
+    """Read "count" from a search response without materializing the jobs."""
+    match = COUNT_PATTERN.search(content)
+    if match:
+        return int(match.group(1))
+    return orjson.loads(content).get("count", 0)
+
+
+def canonical_query(query: Dict[str, Any]) -> bytes:
+    """Serialize a query so that logically equivalent trees give the same bytes.
+    
+    AND(x) and OR(x) become x, NOT(NOT(x)) becomes x, and children of AND/OR
+    are deduplicated and sorted. Condition values are kept as written.
+    """
+    return serialize_query(_canonical_node(query))
+
+
+def _canonical_node(node: Dict[str, Any]) -> Dict[str, Any]:
+    children = node.get("children")
+    if node.get("type") != "operator" or not children:
+        return node
+    children = [_canonical_node(child) for child in children]
+    
+    if node.get("operator") == "NOT":
+        child = children[0]
+        if len(children) == 1 and child.get("type") == "operator" and child.get("operator") == "NOT" and child.get("children"):
+            return child["children"][0]
+        return {**node, "children": children}
+    
+    unique = {serialize_query(child): child for child in children}
+    if len(unique) == 1:
+        return children[0]
+    return {**node, "children": [unique[key] for key in sorted(unique)]}
+
+
+def serialize_query(query: Dict[str, Any]) -> bytes:
+    """Request body for a query, with sorted keys so equal queries give equal bytes."""
+    return orjson.dumps(query, option=orjson.OPT_SORT_KEYS)
+
+
 # Test Query Definitions
 TEST_QUERIES = [
     # === BASIC SINGLE CONDITION QUERIES ===
@@ -484,58 +896,167 @@ TEST_QUERIES = [
             "condition": {"field": "technology", "value": "PYTHON"}
         }
     },
+    
+    # === MATCH MODES ===
+    {
+        "name": "24. Exact Match - Organization: \"apple\" (quoted)",
+        "limit": 10,
+        "query": {
+            "type": "condition",
+            "condition": {"field": "organization", "value": "\"apple\""}
+        }
+    },
+    {
+        "name": "25. Exact Match - Technology: \"python\" (quoted)",
+        "limit": 10,
+        "query": {
+            "type": "condition",
+            "condition": {"field": "technology", "value": "\"python\""}
+        }
+    },
+    {
+        "name": "26. Prefix Match - Organization: 'app*'",
+        "limit": 10,
+        "query": {
+            "type": "condition",
+            "condition": {"field": "organization", "value": "app*"}
+        }
+    },
+    {
+        "name": "27. Prefix Match - Technology: 'java%'",
+        "limit": 10,
+        "query": {
+            "type": "condition",
+            "condition": {"field": "technology", "value": "java%"}
+        }
+    },
+    {
+        "name": "28. NOT Exact - NOT Organization: \"apple\"",
+        "limit": 10,
+        "query": {
+            "type": "operator",
+            "operator": "NOT",
+            "children": [
+                {"type": "condition", "condition": {"field": "organization", "value": "\"apple\""}}
+            ]
+        }
+    },
+    {
+        "name": "29. NOT Exact - NOT Technology: \"java\"",
+        "limit": 10,
+        "query": {
+            "type": "operator",
+            "operator": "NOT",
+            "children": [
+                {"type": "condition", "condition": {"field": "technology", "value": "\"java\""}}
+            ]
+        }
+    },
 ]
 
 
-async def main():
-    print("="*80)
-    print("SUMBLE ADVANCED QUERY API - COMPREHENSIVE TEST SUITE")
-    print("="*80)
+# Serialize each request body once instead of on every request
+for test_def in TEST_QUERIES:
+    test_def["body"] = serialize_query(test_def["query"])
+
+
+class SuiteRunner:
+    """Run the test suite repeatedly on one event loop and one HTTP client.
     
-    tester = APITester()
+    Consecutive runs reuse the open connections and skip the warm-up; call
+    shutdown() when done. Tests are sent one request each unless `batch` is
+    set, in which case they go through the batch endpoint.
+    """
     
-    # Run all tests
-    for test_def in TEST_QUERIES:
-        result = await tester.test_query(
-            name=test_def["name"],
-            query=test_def["query"],
-            limit=test_def["limit"]
-        )
-        tester.print_result(result)
+    def __init__(self, base_url: str = "http://localhost:8000", batch: bool = False):
+        self.batch = batch
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        reports_dir = os.path.join(script_dir, "..", "reports")
+        os.makedirs(reports_dir, exist_ok=True)
+        self.results_path = os.path.join(reports_dir, "test_results.json")
         
-        # Small delay between requests
-        await asyncio.sleep(0.1)
+        # libuv-based event loop (installed with uvicorn[standard])
+        self.loop = uvloop.new_event_loop()
+        self.tester = APITester(base_url, on_result=self._on_result)
+        self._report: Optional[ReportWriter] = None
+        self._warmed_up = False
     
-    # Print summary
-    tester.print_summary()
+    def run(self, test_defs: List[Dict[str, Any]] = TEST_QUERIES) -> List[TestResult]:
+        """Run the tests, print them and export the report, replacing the previous run's."""
+        print("="*80)
+        print("SUMBLE ADVANCED QUERY API - COMPREHENSIVE TEST SUITE")
+        print("="*80)
+        
+        self.tester.reset()
+        # Results are printed and exported as they arrive
+        self._report = ReportWriter(self.results_path)
+        try:
+            results = self.loop.run_until_complete(self._run(test_defs))
+        finally:
+            self._report.close()
+            self._report = None
+        
+        # Print summary
+        self.tester.print_summary()
+        
+        print(f"\n📊 Detailed results exported to reports/test_results.json")
+        print("="*80)
+        return results
     
-    # Export results to JSON
-    results_json = []
-    for r in tester.results:
-        results_json.append({
-            "name": r.name,
-            "limit": r.limit,
-            "success": r.success,
-            "status_code": r.status_code,
-            "response_time_ms": r.response_time_ms,
-            "job_count": r.job_count,
-            "error": r.error
-        })
+    async def _run(self, test_defs: List[Dict[str, Any]]) -> List[TestResult]:
+        if not self._warmed_up:
+            await self.tester.warm_up()
+            self._warmed_up = True
+        
+        if self.batch:
+            # A few batches in flight at once
+            return await self.tester.run_batched(test_defs)
+        # One request per test, CONCURRENCY in flight at once
+        return await self.tester.run_tests(test_defs)
     
-    # Export to reports directory
-    import os
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    reports_dir = os.path.join(script_dir, "..", "reports")
-    os.makedirs(reports_dir, exist_ok=True)
-    results_path = os.path.join(reports_dir, "test_results.json")
+    def _on_result(self, result: TestResult):
+        self.tester.print_result(result)
+        self._report.write(result)
     
-    with open(results_path, "w") as f:
-        json.dump(results_json, f, indent=2)
+    def shutdown(self):
+        """Close the HTTP client and the event loop."""
+        try:
+            self.loop.run_until_complete(self.tester.aclose())
+        finally:
+            self.loop.close()
+
+
+def main(repeat: int = 1, batch: bool = False):
+    runner = SuiteRunner(batch=batch)
+    try:
+        for _ in range(repeat):
+            runner.run()
+    finally:
+        runner.shutdown()
+
+
+def main_single(number: int):
+    """Run one test by its number, without an event loop; the report is not exported."""
+    if not 1 <= number <= len(TEST_QUERIES):
+        raise SystemExit(f"Test number must be between 1 and {len(TEST_QUERIES)}")
     
-    print(f"\n📊 Detailed results exported to reports/test_results.json")
-    print("="*80)
+    tester = APITester(on_result=lambda result: tester.print_result(result))
+    tester.run_sync([TEST_QUERIES[number - 1]])
+    tester.print_summary()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Run the Sumble API test suite")
+    parser.add_argument("--single", type=int, metavar="N",
+                        help="run only test number N, synchronously")
+    parser.add_argument("--repeat", type=int, default=1, metavar="N",
+                        help="run the suite N times on the same connections")
+    parser.add_argument("--batch", action="store_true",
+                        help="send the tests through the batch search endpoint")
+    args = parser.parse_args()
+    
+    if args.single is not None:
+        main_single(args.single)
+    else:
+        main(args.repeat, args.batch)
 